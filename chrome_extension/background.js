@@ -142,6 +142,10 @@ async function handleServerMessage(message) {
         result = await registerCDPListener(tabId, message.eventName, message.listenerId);
         break;
 
+      case 'REGISTER_CDP_LISTENERS':
+        result = await registerCDPListeners(tabId, message.listeners);
+        break;
+
       case 'UNREGISTER_CDP_LISTENER':
         result = await unregisterCDPListener(tabId, message.eventName, message.listenerId);
         break;
@@ -301,6 +305,14 @@ async function registerCDPListener(tabId, eventName, listenerId) {
   return { registered: true };
 }
 
+// Register several CDP event listeners at once
+async function registerCDPListeners(tabId, listeners = []) {
+  for (const { eventName, listenerId } of listeners) {
+    await registerCDPListener(tabId, eventName, listenerId);
+  }
+  return { registered: true, count: listeners.length };
+}
+
 // Unregister CDP event listener
 async function unregisterCDPListener(tabId, eventName, listenerId) {
   const tabListeners = cdpEventListeners.get(tabId);
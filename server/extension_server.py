@@ -7,14 +7,28 @@ It routes messages bidirectionally and maintains session state.
 """
 
 import asyncio
+import heapq
 import json
 import logging
+import sys
 import uuid
-from typing import Dict, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 import websockets
 from websockets.server import WebSocketServerProtocol
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        # Decode so frames stay text; the extension JSON.parse()s event.data
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,21 +37,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Outbound frames buffered per session before it is treated as a slow consumer
+OUT_QUEUE_MAXSIZE = 1024
+
+# Keepalive frames from the extension start with this
+_PING_PREFIX = '{"type":"PING"'
+_PING_PREFIX_BYTES = _PING_PREFIX.encode()
+
+# dataclass(slots=True) needs Python 3.10+
+_dataclass_options = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_dataclass_options)
 class PendingRequest:
     """Represents a pending request waiting for response"""
     future: asyncio.Future
-    timeout_handle: Optional[asyncio.TimerHandle] = None
 
 
-@dataclass
+@dataclass(**_dataclass_options)
 class Session:
     """Represents a Stagehand Python client session"""
     session_id: str
     websocket: WebSocketServerProtocol
     tab_id: Optional[int] = None
-    pending_requests: Dict[str, PendingRequest] = field(default_factory=dict)
+    pending_requests: Dict[int, PendingRequest] = field(default_factory=dict)  # by wire id
+    out_queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=OUT_QUEUE_MAXSIZE))
+    writer_task: Optional[asyncio.Task] = None
 
 
 class ExtensionServer:
@@ -48,18 +73,54 @@ class ExtensionServer:
         self.python_port = python_port
         self.extension_ws: Optional[WebSocketServerProtocol] = None
         self.sessions: Dict[str, Session] = {}
+        # wire id -> (owning session, pending request) for O(1) response routing
+        self._pending: Dict[int, Tuple[Session, PendingRequest]] = {}
+        # Ids requests are forwarded to the extension under; never reused
+        self._next_wire_id = 0
         self.request_timeout = 30  # seconds
+        self.timeout_sweep_interval = 0.25  # seconds
+        # (deadline, wire id) min-heap drained by _sweep_timeouts
+        self._timeout_heap: List[Tuple[float, int]] = []
+        self._timeout_event = asyncio.Event()
+        self.max_message_size = 4 * 1024 * 1024  # bytes
+        self.max_write_buffer = 4 * 1024 * 1024  # bytes, per session, for broadcasts
+
+        # Frames bound for the extension, (payload, wire id or None), sent in
+        # arrival order by _extension_writer; a full queue holds up the
+        # sending client rather than dropping or reordering frames
+        self._ext_queue: Optional[asyncio.Queue] = None
+        self.max_extension_queue = OUT_QUEUE_MAXSIZE
+        self._bg_tasks: Set[asyncio.Task] = set()
+
+        # Fixed control frames, serialized once
+        self._pong_frame = _dumps({'type': 'PONG'})
+        self._ext_disc_frame = _dumps({
+            'type': 'EXTENSION_DISCONNECTED',
+            'error': 'Chrome extension disconnected'
+        })
 
     async def handle_extension(self, websocket: WebSocketServerProtocol):
         """Handle connection from Chrome extension"""
         logger.info("Chrome extension connected")
         self.extension_ws = websocket
+        queue = self._ext_queue = asyncio.Queue(maxsize=self.max_extension_queue)
+        writer = asyncio.create_task(self._extension_writer(websocket, queue))
 
         try:
             async for message in websocket:
+                # Answer keepalives without parsing them (the extension sends
+                # compact JSON.stringify output, so the prefix is exact)
+                if isinstance(message, str):
+                    if message.startswith(_PING_PREFIX):
+                        await websocket.send(self._pong_frame)
+                        continue
+                elif message.startswith(_PING_PREFIX_BYTES):
+                    await websocket.send(self._pong_frame)
+                    continue
+
                 try:
-                    data = json.loads(message)
-                    await self.handle_extension_message(data)
+                    data = _loads(message)
+                    await self.handle_extension_message(data, message)
                 except json.JSONDecodeError as e:
                     logger.error(f"Invalid JSON from extension: {e}")
                 except Exception as e:
@@ -67,139 +128,230 @@ class ExtensionServer:
         except websockets.exceptions.ConnectionClosed:
             logger.info("Chrome extension disconnected")
         finally:
+            writer.cancel()
             self.extension_ws = None
+            self._ext_queue = None
+            # Requests that never made it out won't get a response
+            while not queue.empty():
+                _, wire_id = queue.get_nowait()
+                if wire_id is not None:
+                    self._fail_request(wire_id, ConnectionError("Chrome extension disconnected"))
             # Notify all Python clients
-            for session in list(self.sessions.values()):
-                try:
-                    await session.websocket.send(json.dumps({
-                        'type': 'EXTENSION_DISCONNECTED',
-                        'error': 'Chrome extension disconnected'
-                    }))
-                except:
-                    pass
+            self.broadcast_to_sessions(list(self.sessions.values()), self._ext_disc_frame)
 
-    async def handle_extension_message(self, data: dict):
-        """Handle messages from Chrome extension"""
-        msg_type = data.get('type')
+    async def handle_extension_message(self, data: dict, raw: Optional[str] = None):
+        """Handle messages from Chrome extension
 
-        if msg_type == 'EXTENSION_READY':
-            logger.info("Extension ready")
-            return
-
-        if msg_type == 'PING':
-            # Respond to keepalive
-            if self.extension_ws:
-                await self.extension_ws.send(json.dumps({'type': 'PONG'}))
-            return
+        raw is the original frame, forwarded as-is where the message is
+        proxied unchanged.
+        """
+        msg_type = data['type'] if 'type' in data else None
 
+        # Hot paths first
         if msg_type == 'RESPONSE':
             # Route response back to Python client
-            request_id = data.get('id')
+            request_id = data['id'] if 'id' in data else None
             if request_id:
                 await self.route_response_to_python(request_id, data)
             return
 
         if msg_type == 'CDP_EVENT':
             # Forward CDP event to all interested Python clients
-            await self.forward_cdp_event(data)
+            await self.forward_cdp_event(data, raw)
+            return
+
+        if msg_type == 'PING':
+            # Respond to keepalive
+            if self.extension_ws:
+                await self.extension_ws.send(self._pong_frame)
+            return
+
+        if msg_type == 'EXTENSION_READY':
+            logger.info("Extension ready")
             return
 
-        if msg_type in ['DEBUGGER_DETACHED', 'TAB_CLOSED']:
+        if msg_type in ('DEBUGGER_DETACHED', 'TAB_CLOSED'):
             # Notify Python clients
             await self.notify_python_clients(data)
             return
 
-    async def route_response_to_python(self, request_id: str, response: dict):
+    async def route_response_to_python(self, request_id: int, response: dict):
         """Route response from extension back to Python client"""
-        # Find session with this pending request
-        for session in self.sessions.values():
-            if request_id in session.pending_requests:
-                pending = session.pending_requests.pop(request_id)
-
-                # Cancel timeout
-                if pending.timeout_handle:
-                    pending.timeout_handle.cancel()
-
-                # Set result
-                if response.get('success'):
-                    pending.future.set_result(response.get('result'))
-                else:
-                    error_msg = response.get('error', 'Unknown error')
-                    pending.future.set_exception(Exception(error_msg))
-                return
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            logger.warning(f"No pending request found for ID: {request_id}")
+            return
 
-        logger.warning(f"No pending request found for ID: {request_id}")
+        session, pending = entry
+        session.pending_requests.pop(request_id, None)
 
-    async def forward_cdp_event(self, event: dict):
+        # Set result
+        if pending.future.done():
+            return
+        if response.get('success'):
+            pending.future.set_result(response.get('result'))
+        else:
+            error_msg = response.get('error', 'Unknown error')
+            pending.future.set_exception(Exception(error_msg))
+
+    def send_to_session(self, session: Session, payload: str):
+        """Queue a pre-serialized payload on the session's writer
+
+        A connected session whose queue is full is too slow to keep up and
+        gets disconnected (1013 Try Again Later) rather than buffering
+        without bound.
+        """
+        if self.sessions.get(session.session_id) is not session:
+            # Disconnected: nobody is reading, just drop
+            return
+        try:
+            session.out_queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._disconnect_slow_consumer(session)
+
+    def broadcast_to_sessions(self, sessions: List[Session], payload: str):
+        """Push one pre-serialized payload to several sessions without awaiting
+
+        websockets.broadcast writes straight to each transport, bypassing the
+        session queues, so sessions whose write buffer is already over
+        max_write_buffer are disconnected instead of buffering more.
+        """
+        connections = []
+        for session in sessions:
+            transport = session.websocket.transport
+            if transport is not None and transport.get_write_buffer_size() > self.max_write_buffer:
+                self._disconnect_slow_consumer(session)
+            else:
+                connections.append(session.websocket)
+        if connections:
+            websockets.broadcast(connections, payload)
+
+    def _disconnect_slow_consumer(self, session: Session):
+        """Close a session that can't keep up (1013 Try Again Later)"""
+        # Drop it from fan-out right away so later events don't trip it again
+        # while the close handshake runs
+        if self.sessions.get(session.session_id) is not session:
+            return
+        del self.sessions[session.session_id]
+
+        logger.warning(f"Session {session.session_id} is not keeping up, disconnecting slow consumer")
+        task = asyncio.create_task(
+            session.websocket.close(code=1013, reason='Slow consumer')
+        )
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    async def _writer(self, session: Session):
+        """Drain the session's outbound queue onto its websocket"""
+        queue = session.out_queue
+        while True:
+            batch = [await queue.get()]
+            # Pick up everything queued meanwhile and send it back-to-back
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                for payload in batch:
+                    await session.websocket.send(payload)
+            except websockets.exceptions.ConnectionClosed:
+                return
+            except Exception as e:
+                logger.error(f"Error sending to session {session.session_id}: {e}")
+
+    async def forward_cdp_event(self, event: dict, raw: Optional[str] = None):
         """Forward CDP event to relevant Python sessions"""
         tab_id = event.get('tabId')
 
-        for session in self.sessions.values():
-            if session.tab_id == tab_id or session.tab_id is None:
-                try:
-                    await session.websocket.send(json.dumps(event))
-                except Exception as e:
-                    logger.error(f"Error forwarding CDP event to session {session.session_id}: {e}")
+        targets = [
+            session for session in self.sessions.values()
+            if session.tab_id == tab_id or session.tab_id is None
+        ]
+        if targets:
+            self.broadcast_to_sessions(targets, raw if raw is not None else _dumps(event))
 
     async def notify_python_clients(self, notification: dict):
         """Send notification to all Python clients"""
-        for session in self.sessions.values():
-            try:
-                await session.websocket.send(json.dumps(notification))
-            except Exception as e:
-                logger.error(f"Error notifying session {session.session_id}: {e}")
-
-    async def handle_python_client(self, websocket: WebSocketServerProtocol):
-        """Handle connection from Stagehand Python client"""
+        self.broadcast_to_sessions(list(self.sessions.values()), _dumps(notification))
+
+    async def handle_python_client(
+        self,
+        websocket: WebSocketServerProtocol,
+        first_message: Optional[str] = None
+    ):
+        """Handle connection from Stagehand Python client
+
+        first_message is the frame already consumed while identifying the
+        client; it is processed before reading further frames.
+        """
         session_id = str(uuid.uuid4())
         session = Session(session_id=session_id, websocket=websocket)
-        self.sessions[session_id] = session
 
         logger.info(f"Python client connected: {session_id}")
 
         try:
-            # Send welcome message
-            await websocket.send(json.dumps({
+            # Send welcome directly so it precedes any queued frame
+            await websocket.send(_dumps({
                 'type': 'CONNECTED',
                 'session_id': session_id,
                 'extension_connected': self.extension_ws is not None
             }))
+            # Only now visible to broadcasts, so nothing overtakes the welcome
+            self.sessions[session_id] = session
+            session.writer_task = asyncio.create_task(self._writer(session))
+
+            if first_message is not None:
+                await self.handle_python_frame(session, first_message)
 
             async for message in websocket:
-                try:
-                    data = json.loads(message)
-                    await self.handle_python_message(session, data)
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON from Python client: {e}")
-                    await websocket.send(json.dumps({
-                        'type': 'ERROR',
-                        'error': 'Invalid JSON'
-                    }))
-                except Exception as e:
-                    logger.error(f"Error handling Python message: {e}", exc_info=True)
-                    await websocket.send(json.dumps({
-                        'type': 'ERROR',
-                        'error': str(e)
-                    }))
+                await self.handle_python_frame(session, message)
         except websockets.exceptions.ConnectionClosed:
             logger.info(f"Python client disconnected: {session_id}")
         finally:
-            # Clean up session
-            for pending in session.pending_requests.values():
-                if pending.timeout_handle:
-                    pending.timeout_handle.cancel()
-                if not pending.future.done():
-                    pending.future.set_exception(Exception("Session closed"))
-            del self.sessions[session_id]
-
-    async def handle_python_message(self, session: Session, data: dict):
-        """Handle messages from Python client"""
-        msg_type = data.get('type')
-        request_id = data.get('id')
+            if session.writer_task:
+                session.writer_task.cancel()
+                session.writer_task = None
+            self.sessions.pop(session_id, None)
+            self._close_session(session)
+
+    def _close_session(self, session: Session):
+        """Fail a session's pending requests and forget them"""
+        for request_id, pending in session.pending_requests.items():
+            self._pending.pop(request_id, None)
+            if not pending.future.done():
+                pending.future.set_exception(Exception("Session closed"))
+        session.pending_requests.clear()
+
+    async def handle_python_frame(self, session: Session, message):
+        """Parse a raw frame from a Python client and handle it"""
+        try:
+            data = _loads(message)
+            await self.handle_python_message(session, message, data)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON from Python client: {e}")
+            self.send_to_session(session, _dumps({
+                'type': 'ERROR',
+                'error': 'Invalid JSON'
+            }))
+        except Exception as e:
+            logger.error(f"Error handling Python message: {e}", exc_info=True)
+            self.send_to_session(session, _dumps({
+                'type': 'ERROR',
+                'error': str(e)
+            }))
+
+    async def handle_python_message(self, session: Session, raw, data: dict):
+        """Handle messages from Python client
+
+        data is only used for routing; raw (the original frame) is what gets
+        forwarded to the extension, avoiding a re-serialization.
+        """
+        # Bind routing keys once per frame
+        request_id = data['id'] if 'id' in data else None
+        tab_id = data.get('tabId')
 
         # Check if extension is connected
         if not self.extension_ws:
-            await session.websocket.send(json.dumps({
+            self.send_to_session(session, _dumps({
                 'id': request_id,
                 'type': 'ERROR',
                 'error': 'Chrome extension not connected'
@@ -207,45 +359,88 @@ class ExtensionServer:
             return
 
         # Store tab ID if provided
-        if 'tabId' in data and session.tab_id is None:
-            session.tab_id = data['tabId']
+        if tab_id is not None and session.tab_id is None:
+            session.tab_id = tab_id
+
+        # The extension only parses text frames
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode()
 
         # Forward to extension and wait for response
         if request_id:
             await self.forward_with_response(session, request_id, data)
         else:
-            # Fire and forget
-            await self.extension_ws.send(json.dumps(data))
+            # Fire and forget, but through the same queue so it keeps its
+            # place relative to this client's requests
+            try:
+                await self.send_to_extension(raw)
+            except ConnectionError:
+                pass
+
+    async def send_to_extension(self, payload: str, wire_id: Optional[int] = None):
+        """Queue a frame for the extension, waiting while the queue is full"""
+        queue = self._ext_queue
+        if queue is None:
+            raise ConnectionError("Chrome extension not connected")
+        await queue.put((payload, wire_id))
+
+    async def _extension_writer(self, websocket: WebSocketServerProtocol, queue: asyncio.Queue):
+        """Send queued frames to the extension one at a time, in order"""
+        while True:
+            payload, wire_id = await queue.get()
+            try:
+                await websocket.send(payload)
+            except Exception as e:
+                logger.error(f"Error sending to extension: {e}")
+                if wire_id is not None:
+                    self._fail_request(wire_id, e)
+
+    def _fail_request(self, wire_id: int, exc: Exception):
+        """Fail a pending request before the extension has answered it"""
+        entry = self._pending.pop(wire_id, None)
+        if entry is None:
+            return
+        session, pending = entry
+        session.pending_requests.pop(wire_id, None)
+        if not pending.future.done():
+            pending.future.set_exception(exc)
+
+    async def forward_with_response(self, session: Session, request_id, data: dict):
+        """Forward request to extension and wait for response
+
+        Client ids are only unique per client (and counters restart at 1 on
+        every connection), so the request goes out under a server-wide wire
+        id that is never reused. A late reply to a timed-out request then
+        matches nothing instead of another client's request.
+        """
+        loop = asyncio.get_running_loop()
 
-    async def forward_with_response(self, session: Session, request_id: str, data: dict):
-        """Forward request to extension and wait for response"""
         # Create future for response
-        future = asyncio.Future()
-
-        # Set timeout
-        loop = asyncio.get_event_loop()
-        timeout_handle = loop.call_later(
-            self.request_timeout,
-            self.handle_request_timeout,
-            session,
-            request_id
-        )
+        future = loop.create_future()
+
+        self._next_wire_id += 1
+        wire_id = self._next_wire_id
+        data['id'] = wire_id
+        raw = _dumps(data)
+
+        # Schedule timeout; the heap is the only record of the deadline
+        heapq.heappush(self._timeout_heap, (loop.time() + self.request_timeout, wire_id))
+        self._timeout_event.set()
 
         # Store pending request
-        session.pending_requests[request_id] = PendingRequest(
-            future=future,
-            timeout_handle=timeout_handle
-        )
+        pending = PendingRequest(future=future)
+        session.pending_requests[wire_id] = pending
+        self._pending[wire_id] = (session, pending)
 
         try:
             # Forward to extension
-            await self.extension_ws.send(json.dumps(data))
+            await self.send_to_extension(raw, wire_id)
 
             # Wait for response
             result = await future
 
             # Send result back to Python client
-            await session.websocket.send(json.dumps({
+            self.send_to_session(session, _dumps({
                 'id': request_id,
                 'type': 'RESPONSE',
                 'result': result,
@@ -256,20 +451,45 @@ class ExtensionServer:
             logger.error(f"Error forwarding request {request_id}: {e}")
 
             # Send error back to Python client
-            await session.websocket.send(json.dumps({
+            self.send_to_session(session, _dumps({
                 'id': request_id,
                 'type': 'RESPONSE',
                 'error': str(e),
                 'success': False
             }))
+        finally:
+            # Already gone if answered or expired; not if it never went out
+            self._pending.pop(wire_id, None)
+            session.pending_requests.pop(wire_id, None)
 
-    def handle_request_timeout(self, session: Session, request_id: str):
+    def handle_request_timeout(self, session: Session, request_id: int):
         """Handle request timeout"""
+        self._pending.pop(request_id, None)
         if request_id in session.pending_requests:
             pending = session.pending_requests.pop(request_id)
             if not pending.future.done():
                 pending.future.set_exception(TimeoutError(f"Request {request_id} timed out after {self.request_timeout}s"))
 
+    async def _sweep_timeouts(self):
+        """Expire pending requests whose deadline has passed"""
+        loop = asyncio.get_running_loop()
+        heap = self._timeout_heap
+        while True:
+            if not heap:
+                self._timeout_event.clear()
+                await self._timeout_event.wait()
+
+            await asyncio.sleep(self.timeout_sweep_interval)
+
+            now = loop.time()
+            while heap and heap[0][0] <= now:
+                _, request_id = heapq.heappop(heap)
+                entry = self._pending.get(request_id)
+                # Skip requests that already completed
+                if entry is None:
+                    continue
+                self.handle_request_timeout(entry[0], request_id)
+
     async def start(self):
         """Start the WebSocket server"""
         logger.info(f"Starting Stagehand Extension Server...")
@@ -281,56 +501,37 @@ class ExtensionServer:
             # Determine if this is extension or Python client based on first message
             try:
                 first_message = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                data = json.loads(first_message)
+                data = _loads(first_message)
 
                 # Extension sends EXTENSION_READY on connect
                 if data.get('type') == 'EXTENSION_READY':
-                    # Put message back for processing
                     await self.handle_extension(websocket)
                 else:
-                    # This is a Python client
-                    # Create async generator to replay first message
-                    async def message_gen():
-                        yield first_message
-                        async for msg in websocket:
-                            yield msg
-
-                    # Handle as Python client
-                    session_id = str(uuid.uuid4())
-                    session = Session(session_id=session_id, websocket=websocket)
-                    self.sessions[session_id] = session
-
-                    logger.info(f"Python client connected: {session_id}")
-
-                    try:
-                        # Send welcome message
-                        await websocket.send(json.dumps({
-                            'type': 'CONNECTED',
-                            'session_id': session_id,
-                            'extension_connected': self.extension_ws is not None
-                        }))
-
-                        # Process first message
-                        await self.handle_python_message(session, data)
-
-                        # Process remaining messages
-                        async for message in websocket:
-                            try:
-                                msg_data = json.loads(message)
-                                await self.handle_python_message(session, msg_data)
-                            except Exception as e:
-                                logger.error(f"Error: {e}", exc_info=True)
-                    finally:
-                        del self.sessions[session_id]
+                    await self.handle_python_client(websocket, first_message=first_message)
 
             except asyncio.TimeoutError:
                 logger.error("Client didn't send initial message in time")
             except Exception as e:
                 logger.error(f"Error in handler: {e}", exc_info=True)
 
-        async with websockets.serve(handler, self.host, self.python_port):
+        # Localhost bridge: skip permessage-deflate and raise the frame size cap
+        # so large CDP payloads (DOM snapshots, response bodies) fit
+        async with websockets.serve(
+            handler,
+            self.host,
+            self.python_port,
+            compression=None,
+            max_size=self.max_message_size,
+            max_queue=256,
+            ping_interval=20,
+            ping_timeout=20,
+        ):
             logger.info(f"✅ Server running on ws://{self.host}:{self.python_port}")
-            await asyncio.Future()  # Run forever
+            sweeper = asyncio.create_task(self._sweep_timeouts())
+            try:
+                await asyncio.Future()  # Run forever
+            finally:
+                sweeper.cancel()
 
 
 async def main():
@@ -340,6 +541,12 @@ async def main():
 
 
 if __name__ == '__main__':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
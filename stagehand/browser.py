@@ -2,10 +2,13 @@ import asyncio
 import json
 import os
 import shutil
+import socket
 import tempfile
+import time
 import uuid
 from pathlib import Path
 from typing import Any, Optional
+from urllib.parse import urlsplit, urlunsplit
 
 from browserbase import Browserbase
 from browserbase.types import SessionCreateParams as BrowserbaseSessionCreateParams
@@ -20,10 +23,69 @@ try:
 except ImportError:
     websockets = None
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        # Text frames: the extension server forwards them to the Chrome
+        # extension as-is, and it only parses text
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
 from .context import StagehandContext
 from .logging import StagehandLogger
 from .page import StagehandPage
 
+# Init script applied to every local context to make the browser less detectable
+_STEALTH_SCRIPT = """
+    (() => {
+        // Override navigator.webdriver
+        if (navigator.webdriver) {
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            });
+        }
+
+        // Mock languages and plugins
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['en-US', 'en'],
+        });
+
+        // Avoid complex plugin mocking, just return a non-empty array like structure
+        if (navigator.plugins instanceof PluginArray && navigator.plugins.length === 0) {
+             Object.defineProperty(navigator, 'plugins', {
+                get: () => Object.values({
+                    'plugin1': { name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer', description: 'Portable Document Format' },
+                    'plugin2': { name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai', description: '' },
+                    'plugin3': { name: 'Native Client', filename: 'internal-nacl-plugin', description: '' }
+                }),
+            });
+        }
+
+        // Remove Playwright-specific properties from window
+        try {
+            delete window.__playwright_run; // Example property, check actual properties if needed
+            delete window.navigator.__proto__.webdriver; // Another common place
+        } catch (e) {}
+
+        // Override permissions API (example for notifications)
+        if (window.navigator && window.navigator.permissions) {
+            const originalQuery = window.navigator.permissions.query;
+            window.navigator.permissions.query = (parameters) => {
+                if (parameters && parameters.name === 'notifications') {
+                    return Promise.resolve({ state: Notification.permission });
+                }
+                // Call original for other permissions
+                return originalQuery.apply(window.navigator.permissions, [parameters]);
+            };
+        }
+    })();
+    """
+
 
 async def connect_browserbase_browser(
     playwright: Playwright,
@@ -49,7 +111,7 @@ async def connect_browserbase_browser(
     bb = Browserbase(api_key=browserbase_api_key)
     try:
         if session_id:
-            session = bb.sessions.retrieve(session_id)
+            session = await asyncio.to_thread(bb.sessions.retrieve, session_id)
             if session.status != "RUNNING":
                 raise RuntimeError(
                     f"Browserbase session {session_id} is not running (status: {session.status})"
@@ -68,7 +130,9 @@ async def connect_browserbase_browser(
                 if not stagehand_instance.browserbase_session_create_params
                 else stagehand_instance.browserbase_session_create_params
             )
-            session = bb.sessions.create(**browserbase_session_create_params)
+            session = await asyncio.to_thread(
+                bb.sessions.create, **browserbase_session_create_params
+            )
             if not session.id:
                 raise Exception("Could not create Browserbase session")
             stagehand_instance.session_id = session.id
@@ -152,40 +216,12 @@ async def connect_local_browser(
         logger.info("Launching new local browser context...")
         browser = None
 
-        user_data_dir_option = local_browser_launch_options.get("user_data_dir")
-        if user_data_dir_option:
-            user_data_dir = Path(user_data_dir_option).resolve()
-        else:
-            # Create temporary directory
-            temp_dir = tempfile.mkdtemp(prefix="stagehand_ctx_")
-            temp_user_data_dir = Path(temp_dir)
-            user_data_dir = temp_user_data_dir
-            # Create Default profile directory and Preferences file like in TS
-            default_profile_path = user_data_dir / "Default"
-            default_profile_path.mkdir(parents=True, exist_ok=True)
-            prefs_path = default_profile_path / "Preferences"
-            default_prefs = {"plugins": {"always_open_pdf_externally": True}}
-            try:
-                with open(prefs_path, "w") as f:
-                    json.dump(default_prefs, f)
-                logger.debug(
-                    f"Created temporary user_data_dir with default preferences: {user_data_dir}"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Failed to write default preferences to {prefs_path}: {e}"
-                )
-
-        downloads_path_option = local_browser_launch_options.get("downloads_path")
-        if downloads_path_option:
-            downloads_path = str(Path(downloads_path_option).resolve())
-        else:
-            downloads_path = str(Path.cwd() / "downloads")
-        try:
-            os.makedirs(downloads_path, exist_ok=True)
-            logger.debug(f"Using downloads_path: {downloads_path}")
-        except Exception as e:
-            logger.error(f"Failed to create downloads_path {downloads_path}: {e}")
+        user_data_dir, downloads_path, temp_user_data_dir = await asyncio.to_thread(
+            _prepare_profile_dirs,
+            local_browser_launch_options.get("user_data_dir"),
+            local_browser_launch_options.get("downloads_path"),
+            logger,
+        )
 
         # Prepare Launch Options (translate keys if needed)
         launch_options = {
@@ -257,55 +293,64 @@ async def connect_local_browser(
     return browser, context, stagehand_context, page, temp_user_data_dir
 
 
-async def apply_stealth_scripts(context: BrowserContext, logger: StagehandLogger):
-    """Applies JavaScript init scripts to make the browser less detectable."""
-    logger.debug("Applying stealth scripts to the context...")
-    stealth_script = """
-    (() => {
-        // Override navigator.webdriver
-        if (navigator.webdriver) {
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        }
-
-        // Mock languages and plugins
-        Object.defineProperty(navigator, 'languages', {
-            get: () => ['en-US', 'en'],
-        });
+def _prepare_profile_dirs(
+    user_data_dir_option: Optional[str],
+    downloads_path_option: Optional[str],
+    logger: StagehandLogger,
+) -> tuple[Path, str, Optional[Path]]:
+    """
+    Create the user data and downloads directories for a local browser.
 
-        // Avoid complex plugin mocking, just return a non-empty array like structure
-        if (navigator.plugins instanceof PluginArray && navigator.plugins.length === 0) {
-             Object.defineProperty(navigator, 'plugins', {
-                get: () => Object.values({
-                    'plugin1': { name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer', description: 'Portable Document Format' },
-                    'plugin2': { name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai', description: '' },
-                    'plugin3': { name: 'Native Client', filename: 'internal-nacl-plugin', description: '' }
-                }),
-            });
-        }
+    Runs blocking filesystem calls, so call it via asyncio.to_thread.
 
-        // Remove Playwright-specific properties from window
-        try {
-            delete window.__playwright_run; // Example property, check actual properties if needed
-            delete window.navigator.__proto__.webdriver; // Another common place
-        } catch (e) {}
+    Args:
+        user_data_dir_option: User data directory to use, or None to create a temporary one
+        downloads_path_option: Downloads directory to use, or None for ./downloads
+        logger: The logger instance
 
-        // Override permissions API (example for notifications)
-        if (window.navigator && window.navigator.permissions) {
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => {
-                if (parameters && parameters.name === 'notifications') {
-                    return Promise.resolve({ state: Notification.permission });
-                }
-                // Call original for other permissions
-                return originalQuery.apply(window.navigator.permissions, [parameters]);
-            };
-        }
-    })();
+    Returns:
+        tuple of (user_data_dir, downloads_path, temp_user_data_dir)
     """
+    temp_user_data_dir = None
+    if user_data_dir_option:
+        user_data_dir = Path(user_data_dir_option).resolve()
+    else:
+        # Create temporary directory
+        temp_dir = tempfile.mkdtemp(prefix="stagehand_ctx_")
+        temp_user_data_dir = Path(temp_dir)
+        user_data_dir = temp_user_data_dir
+        # Create Default profile directory and Preferences file like in TS
+        default_profile_path = user_data_dir / "Default"
+        default_profile_path.mkdir(parents=True, exist_ok=True)
+        prefs_path = default_profile_path / "Preferences"
+        default_prefs = {"plugins": {"always_open_pdf_externally": True}}
+        try:
+            with open(prefs_path, "w") as f:
+                json.dump(default_prefs, f)
+            logger.debug(
+                f"Created temporary user_data_dir with default preferences: {user_data_dir}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to write default preferences to {prefs_path}: {e}")
+
+    if downloads_path_option:
+        downloads_path = str(Path(downloads_path_option).resolve())
+    else:
+        downloads_path = str(Path.cwd() / "downloads")
+    try:
+        os.makedirs(downloads_path, exist_ok=True)
+        logger.debug(f"Using downloads_path: {downloads_path}")
+    except Exception as e:
+        logger.error(f"Failed to create downloads_path {downloads_path}: {e}")
+
+    return user_data_dir, downloads_path, temp_user_data_dir
+
+
+async def apply_stealth_scripts(context: BrowserContext, logger: StagehandLogger):
+    """Applies JavaScript init scripts to make the browser less detectable."""
+    logger.debug("Applying stealth scripts to the context...")
     try:
-        await context.add_init_script(stealth_script)
+        await context.add_init_script(_STEALTH_SCRIPT)
     except Exception as e:
         logger.error(f"Failed to add stealth init script: {str(e)}")
 
@@ -340,25 +385,33 @@ async def cleanup_browser_resources(
         except Exception as e:
             logger.error(f"Error closing browser: {str(e)}")
 
-    # Clean up temporary user data directory if created
-    if temp_user_data_dir:
+    # Once the browser is gone, removing its profile directory and stopping
+    # Playwright are independent, so let them overlap
+    async def remove_temp_user_data_dir():
         try:
             logger.debug(
                 f"Removing temporary user data directory: {temp_user_data_dir}"
             )
-            shutil.rmtree(temp_user_data_dir)
+            await asyncio.to_thread(shutil.rmtree, temp_user_data_dir)
         except Exception as e:
             logger.error(
                 f"Error removing temporary directory {temp_user_data_dir}: {str(e)}"
             )
 
-    if playwright:
+    async def stop_playwright():
         try:
             logger.debug("Stopping Playwright...")
             await playwright.stop()
         except Exception as e:
             logger.error(f"Error stopping Playwright: {str(e)}")
 
+    closers = []
+    if temp_user_data_dir:
+        closers.append(remove_temp_user_data_dir())
+    if playwright:
+        closers.append(stop_playwright())
+    await asyncio.gather(*closers)
+
 
 # ============================================================================
 # Extension Mode - Connection to Chrome Extension via WebSocket
@@ -390,19 +443,37 @@ async def connect_extension_browser(
     logger.info(f"Connecting to extension server at {server_url}")
 
     try:
-        # Connect to WebSocket server
-        ws = await websockets.connect(server_url)
+        # Connect to WebSocket server. Inbound frame size is already capped
+        # by the server, compression only costs CPU on a local bridge, and
+        # the server's own pings keep the connection checked
+        ws = await websockets.connect(
+            server_url,
+            max_size=None,
+            compression=None,
+            write_limit=2**20,
+            ping_interval=None,
+        )
+        _set_low_latency_socket_options(ws)
         logger.info("Connected to extension server")
 
-        # Send initial message (server needs this to identify us as Python client)
-        await ws.send(json.dumps({'type': 'INIT'}))
+        # Start the manager first so the welcome message and the first
+        # command's response are routed by the same receiver
+        ws_manager = WebSocketManager(ws, logger)
+        await ws_manager.start()
 
-        # Wait for welcome message (before starting manager)
-        welcome = await asyncio.wait_for(ws.recv(), timeout=5.0)
-        welcome_data = json.loads(welcome)
+        # Send initial message (server needs this to identify us as Python client)
+        await ws.send(_dumps({'type': 'INIT'}))
+
+        # Pipeline GET_ACTIVE_TAB behind INIT instead of waiting a round-trip
+        # for the welcome message first
+        welcome_data, tab_info = await asyncio.gather(
+            ws_manager.wait_for_welcome(timeout=5.0),
+            ws_manager.send_tab_command('GET_ACTIVE_TAB', timeout=5.0),
+            return_exceptions=True,
+        )
 
-        if welcome_data.get('type') != 'CONNECTED':
-            raise RuntimeError(f"Unexpected welcome message: {welcome_data}")
+        if isinstance(welcome_data, BaseException):
+            raise welcome_data
 
         if not welcome_data.get('extension_connected'):
             logger.warning("Chrome extension is not connected to server!")
@@ -411,14 +482,8 @@ async def connect_extension_browser(
         session_id = welcome_data['session_id']
         logger.info(f"Session ID: {session_id}")
 
-        # NOW start the WebSocket manager (after initial handshake)
-        ws_manager = WebSocketManager(ws)
-        await ws_manager.start()
-
-        # Get active tab from extension
-        tab_info = await send_extension_command(
-            ws_manager, 'GET_ACTIVE_TAB', {}, timeout=5.0
-        )
+        if isinstance(tab_info, BaseException):
+            raise tab_info
 
         tab_id = tab_info['tabId']
         logger.info(f"Active tab: {tab_id} - {tab_info.get('title', 'Untitled')}")
@@ -452,148 +517,268 @@ async def connect_extension_browser(
         raise
 
 
+def _set_low_latency_socket_options(ws) -> None:
+    """Disable Nagle (and delayed ACKs on Linux) on a WebSocket's TCP socket.
+
+    The extension protocol is many small request/response frames, which
+    Nagle's algorithm combined with delayed ACKs can stall.
+    """
+    try:
+        sock = ws.transport.get_extra_info("socket")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if hasattr(socket, "TCP_QUICKACK"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    except (AttributeError, OSError):
+        # Not a TCP transport (e.g. unix socket) or option unsupported
+        pass
+
+
+# Pre-encoded payloads for the fixed-shape commands polled on hot paths;
+# only the request ID and tab ID vary. Kept as str so they go out as text
+# frames like every other command
+_TAB_COMMAND_TEMPLATES = {
+    'GET_ACTIVE_TAB': '{"id":%d,"type":"GET_ACTIVE_TAB"}',
+    'GET_TAB_INFO': '{"id":%d,"type":"GET_TAB_INFO","tabId":%d}',
+    'DETACH_DEBUGGER': '{"id":%d,"type":"DETACH_DEBUGGER","tabId":%d}',
+    'CLOSE_TAB': '{"id":%d,"type":"CLOSE_TAB","tabId":%d}',
+}
+
+
 class WebSocketManager:
     """Manages WebSocket communication with message routing"""
 
-    def __init__(self, ws: websockets.WebSocketClientProtocol):
+    __slots__ = (
+        'ws',
+        'logger',
+        'pending_responses',
+        'event_handlers',
+        '_receiver_task',
+        '_bg_tasks',
+        '_next_id',
+        '_loop',
+        '_welcome',
+        '_last_error_ts',
+        '_suppressed_errors',
+        '_error_flush_handle',
+    )
+
+    def __init__(self, ws: websockets.WebSocketClientProtocol, logger: Optional[StagehandLogger] = None):
         self.ws = ws
+        self.logger = logger or StagehandLogger()
         self.pending_responses = {}  # request_id -> Future
-        self.event_handlers = {}  # event_name -> list of callbacks
+        self.event_handlers = {}  # event_name -> tuple of callbacks
         self._receiver_task = None
+        self._bg_tasks = set()  # fire-and-forget commands, referenced until done
+        self._next_id = 0
+        self._loop = None
+        self._welcome = None  # Future resolved by the server's CONNECTED message
+        self._last_error_ts = float('-inf')
+        self._suppressed_errors = 0
+        self._error_flush_handle = None  # reports the suppressed count when the window ends
 
     async def start(self):
         """Start the message receiver task"""
+        self._loop = asyncio.get_running_loop()
+        self._welcome = self._loop.create_future()
         self._receiver_task = asyncio.create_task(self._message_receiver())
 
+    async def wait_for_welcome(self, timeout: float = 5.0) -> dict:
+        """Wait for the server's CONNECTED message"""
+        return await asyncio.wait_for(asyncio.shield(self._welcome), timeout=timeout)
+
     async def _message_receiver(self):
         """Background task that receives and routes all messages"""
+        # Bound once: the loop body runs for every frame of a CDP event
+        # stream. Both containers are only ever mutated in place
+        pending = self.pending_responses
+        handlers_map = self.event_handlers
+        loads = _loads
         try:
             async for message in self.ws:
                 try:
-                    data = json.loads(message)
-
-                    # Route response messages
-                    if data.get('type') == 'RESPONSE' and data.get('id') in self.pending_responses:
-                        future = self.pending_responses.pop(data['id'])
-                        if not future.done():
-                            if data.get('success'):
-                                future.set_result(data.get('result'))
-                            else:
-                                future.set_exception(RuntimeError(data.get('error', 'Unknown error')))
+                    data = loads(message)
+                    msg_type = data.get('type')
 
                     # Route CDP events
-                    elif data.get('type') == 'CDP_EVENT':
-                        event_name = data.get('method')
-                        if event_name in self.event_handlers:
+                    if msg_type == 'CDP_EVENT':
+                        # Tuples are replaced, never mutated, so iterating one
+                        # is safe even if a callback (un)registers handlers
+                        handlers = handlers_map.get(data.get('method'))
+                        if handlers:
                             params = data.get('params', {})
-                            for callback in self.event_handlers[event_name]:
+                            for callback in handlers:
                                 try:
                                     callback(params)
                                 except Exception as e:
-                                    print(f"Error in event handler: {e}")
+                                    self._log_error(f"Error in event handler: {e}")
 
-                except json.JSONDecodeError:
+                    # Route response messages
+                    elif msg_type == 'RESPONSE':
+                        future = pending.pop(data.get('id'), None)
+                        if future is not None:
+                            # Timed-out waiters remove their own entry, so a
+                            # popped future is almost always still pending;
+                            # a caller cancelled from outside is the exception
+                            try:
+                                if data.get('success'):
+                                    future.set_result(data.get('result'))
+                                else:
+                                    future.set_exception(RuntimeError(data.get('error', 'Unknown error')))
+                            except asyncio.InvalidStateError:
+                                pass
+
+                    # Welcome message sent once after INIT
+                    elif msg_type == 'CONNECTED':
+                        if not self._welcome.done():
+                            self._welcome.set_result(data)
+
+                except json.JSONDecodeError:  # also covers orjson's
                     pass
                 except Exception as e:
-                    print(f"Error processing message: {e}")
+                    self._log_error(f"Error processing message: {e}")
         except asyncio.CancelledError:
             pass
         except Exception as e:
-            print(f"Error in message receiver: {e}")
+            self._log_error(f"Error in message receiver: {e}")
+        finally:
+            # No more responses can arrive; fail waiters now rather than
+            # letting each run into its timeout
+            self._fail_pending(ConnectionError("Connection to extension server closed"))
+
+    def _fail_pending(self, exc: Exception):
+        """Fail every command still waiting for a response"""
+        futures = list(self.pending_responses.values())
+        self.pending_responses.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _log_error(self, message: str):
+        """Log an error, at most once per second"""
+        # A failing CDP event handler can raise on every event of a flood;
+        # the rest of the window is only counted and reported when it ends
+        now = time.monotonic()
+        if now - self._last_error_ts < 1.0:
+            if not self._suppressed_errors:
+                self._error_flush_handle = asyncio.get_running_loop().call_later(
+                    self._last_error_ts + 1.0 - now, self._flush_suppressed_errors
+                )
+            self._suppressed_errors += 1
+            return
+
+        self._flush_suppressed_errors()
+        self._last_error_ts = now
+        self.logger.error(message)
+
+    def _flush_suppressed_errors(self):
+        """Log how many errors were suppressed since the last one logged"""
+        if self._error_flush_handle is not None:
+            self._error_flush_handle.cancel()
+            self._error_flush_handle = None
+        if self._suppressed_errors:
+            self.logger.error(f"{self._suppressed_errors} more error(s) suppressed after the last one")
+            self._suppressed_errors = 0
 
     async def send_command(self, command_type: str, params: dict, timeout: float = 30.0) -> Any:
         """Send command and wait for response"""
-        request_id = str(uuid.uuid4())
+        self._next_id += 1
+        request_id = self._next_id
 
         message = {
             'id': request_id,
             'type': command_type,
             **params
         }
+        return await self._send_payload(command_type, request_id, _dumps(message), timeout)
 
+    async def send_tab_command(self, command_type: str, tab_id: Optional[int] = None, timeout: float = 30.0) -> Any:
+        """Send a command that takes at most a tab ID, skipping JSON encoding"""
+        self._next_id += 1
+        request_id = self._next_id
+
+        template = _TAB_COMMAND_TEMPLATES[command_type]
+        if tab_id is None:
+            payload = template % request_id
+        else:
+            payload = template % (request_id, tab_id)
+        return await self._send_payload(command_type, request_id, payload, timeout)
+
+    async def _send_payload(self, command_type: str, request_id: int, payload: str, timeout: float) -> Any:
+        """Send an encoded command and wait for its response"""
         # Create future for response
-        future = asyncio.Future()
+        future = self._loop.create_future()
         self.pending_responses[request_id] = future
 
-        # Send message
-        await self.ws.send(json.dumps(message))
+        try:
+            await self.ws.send(payload)
+        except Exception:
+            self.pending_responses.pop(request_id, None)
+            raise
 
         # Wait for response with timeout
         try:
             result = await asyncio.wait_for(future, timeout=timeout)
             return result
         except asyncio.TimeoutError:
-            self.pending_responses.pop(request_id, None)
+            future = self.pending_responses.pop(request_id, None)
+            if future is not None:
+                future.cancel()
             raise TimeoutError(f"Command {command_type} timed out after {timeout}s")
 
+    def send_command_nowait(self, command_type: str, params: dict, timeout: float = 5.0):
+        """Send a command in the background, logging rather than raising failures"""
+        task = asyncio.create_task(self._send_background(command_type, params, timeout))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    async def _send_background(self, command_type: str, params: dict, timeout: float):
+        try:
+            await self.send_command(command_type, params, timeout)
+        except Exception as e:
+            self._log_error(f"Error sending {command_type}: {e}")
+
     def register_event_handler(self, event_name: str, callback):
         """Register an event handler"""
-        if event_name not in self.event_handlers:
-            self.event_handlers[event_name] = []
-        self.event_handlers[event_name].append(callback)
+        self.event_handlers[event_name] = self.event_handlers.get(event_name, ()) + (callback,)
 
     def unregister_event_handler(self, event_name: str, callback):
         """Unregister an event handler"""
-        if event_name in self.event_handlers:
-            try:
-                self.event_handlers[event_name].remove(callback)
-            except ValueError:
-                pass
+        handlers = self.event_handlers.get(event_name)
+        if handlers and callback in handlers:
+            index = handlers.index(callback)
+            remaining = handlers[:index] + handlers[index + 1:]
+            if remaining:
+                self.event_handlers[event_name] = remaining
+            else:
+                del self.event_handlers[event_name]
 
     async def close(self):
         """Close the WebSocket manager"""
+        self._fail_pending(ConnectionError("WebSocket manager closed"))
         if self._receiver_task:
             self._receiver_task.cancel()
             try:
                 await self._receiver_task
             except asyncio.CancelledError:
                 pass
+        self._flush_suppressed_errors()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
 
 async def send_extension_command(
-    ws_or_manager,
+    ws_manager: WebSocketManager,
     command_type: str,
     params: dict,
     timeout: float = 30.0
 ) -> Any:
     """Send command to extension and wait for response"""
-    # Support both WebSocketManager and raw WebSocket (for backwards compat)
-    if isinstance(ws_or_manager, WebSocketManager):
-        return await ws_or_manager.send_command(command_type, params, timeout)
-
-    # Fallback for raw WebSocket (deprecated, will cause issues with concurrent recv)
-    ws = ws_or_manager
-    request_id = str(uuid.uuid4())
-
-    message = {
-        'id': request_id,
-        'type': command_type,
-        **params
-    }
-
-    await ws.send(json.dumps(message))
-
-    # Wait for response
-    start_time = asyncio.get_event_loop().time()
-    while True:
-        if asyncio.get_event_loop().time() - start_time > timeout:
-            raise TimeoutError(f"Command {command_type} timed out after {timeout}s")
-
-        try:
-            response = await asyncio.wait_for(ws.recv(), timeout=1.0)
-            response_data = json.loads(response)
-
-            # Check if this is our response
-            if response_data.get('id') == request_id and response_data.get('type') == 'RESPONSE':
-                if response_data.get('success'):
-                    return response_data.get('result')
-                else:
-                    error = response_data.get('error', 'Unknown error')
-                    raise RuntimeError(f"Extension command failed: {error}")
-
-        except asyncio.TimeoutError:
-            # Continue waiting
-            continue
+    return await ws_manager.send_command(command_type, params, timeout)
 
 
 class ExtensionContext:
@@ -605,14 +790,31 @@ class ExtensionContext:
         self.logger = logger
         self.stagehand = stagehand
         self._pages = []
-        self._cdp_sessions = {}
+        self._cdp_sessions = {}  # id(page) -> session
+        self._cdp_sessions_by_tab = {}  # tab_id -> session shared by every page on the tab
 
     async def new_cdp_session(self, page: "StagehandPage") -> "ExtensionCDPSession":
-        """Create a new CDP session (returns wrapper around WebSocket)"""
-        session = ExtensionCDPSession(self.ws_manager, self.tab_id, self.logger)
+        """Get the CDP session for the tab (returns wrapper around WebSocket)
+
+        Every page on a tab shares one session, so listeners are registered
+        with the extension once. Each call takes a reference that is released
+        by the session's detach().
+        """
+        session = self._cdp_sessions_by_tab.get(self.tab_id)
+        if session is None:
+            session = ExtensionCDPSession(self.ws_manager, self.tab_id, self.logger, context=self)
+            self._cdp_sessions_by_tab[self.tab_id] = session
+        session._refs += 1
         self._cdp_sessions[id(page)] = session
         return session
 
+    def _release_cdp_session(self, session: "ExtensionCDPSession"):
+        """Forget a session once its last reference has been detached"""
+        if self._cdp_sessions_by_tab.get(session.tab_id) is session:
+            del self._cdp_sessions_by_tab[session.tab_id]
+        for key in [key for key, value in self._cdp_sessions.items() if value is session]:
+            del self._cdp_sessions[key]
+
     @property
     def pages(self) -> list:
         """Return list of pages (just the current tab)"""
@@ -644,12 +846,7 @@ class ExtensionContext:
     async def close(self):
         """Close the context (detach debugger)"""
         try:
-            await send_extension_command(
-                self.ws_manager,
-                'DETACH_DEBUGGER',
-                {'tabId': self.tab_id},
-                timeout=5.0
-            )
+            await self.ws_manager.send_tab_command('DETACH_DEBUGGER', self.tab_id, timeout=5.0)
         except Exception as e:
             self.logger.error(f"Error detaching debugger: {e}")
 
@@ -662,12 +859,28 @@ class ExtensionContext:
 class ExtensionCDPSession:
     """Mimics Playwright CDPSession for extension mode"""
 
-    def __init__(self, ws_manager: WebSocketManager, tab_id: int, logger: StagehandLogger):
+    __slots__ = (
+        'ws_manager',
+        'tab_id',
+        'logger',
+        '_context',
+        '_refs',
+        '_listeners',
+        '_listener_ids',
+        '_pending_regs',
+        '_reg_flush_handle',
+    )
+
+    def __init__(self, ws_manager: WebSocketManager, tab_id: int, logger: StagehandLogger, context=None):
         self.ws_manager = ws_manager
         self.tab_id = tab_id
         self.logger = logger
+        self._context = context
+        self._refs = 0  # holders that have not detached yet
         self._listeners = {}  # eventName -> list of callbacks
         self._listener_ids = {}  # eventName -> listener ID
+        self._pending_regs = []  # listeners waiting for the next batched registration
+        self._reg_flush_handle = None
 
     async def send(self, method: str, params: Optional[dict] = None) -> dict:
         """Send CDP command via extension"""
@@ -690,99 +903,347 @@ class ExtensionCDPSession:
             listener_id = str(uuid.uuid4())
             self._listener_ids[event_name] = listener_id
 
-            # Register with WebSocket manager
-            self.ws_manager.register_event_handler(event_name, callback)
+            # Queue registration; everything registered in this loop
+            # iteration goes out as one command
+            self._pending_regs.append({
+                'eventName': event_name,
+                'listenerId': listener_id
+            })
+            if self._reg_flush_handle is None:
+                self._reg_flush_handle = asyncio.get_running_loop().call_soon(
+                    self._flush_regs
+                )
 
-            # Send registration command (fire and forget)
-            asyncio.create_task(send_extension_command(
-                self.ws_manager,
-                'REGISTER_CDP_LISTENER',
+        # The session may be shared, so every callback is routed, not just
+        # the first one for an event
+        self.ws_manager.register_event_handler(event_name, callback)
+        self._listeners[event_name].append(callback)
+
+    def _flush_regs(self):
+        """Send queued listener registrations as a single command (fire and forget)"""
+        self._reg_flush_handle = None
+        listeners, self._pending_regs = self._pending_regs, []
+        if listeners:
+            self.ws_manager.send_command_nowait(
+                'REGISTER_CDP_LISTENERS',
                 {
                     'tabId': self.tab_id,
-                    'eventName': event_name,
-                    'listenerId': listener_id
-                },
-                timeout=5.0
-            ))
-
-        self._listeners[event_name].append(callback)
+                    'listeners': listeners
+                }
+            )
 
     def remove_listener(self, event_name: str, callback):
         """Remove event listener"""
         if event_name in self._listeners:
             try:
                 self._listeners[event_name].remove(callback)
+                self.ws_manager.unregister_event_handler(event_name, callback)
 
                 # If no more listeners, unregister with server
                 if not self._listeners[event_name]:
                     del self._listeners[event_name]
                     if event_name in self._listener_ids:
                         listener_id = self._listener_ids.pop(event_name)
-                        asyncio.create_task(send_extension_command(
-                            self.ws_manager,
+                        if self._drop_pending_reg(listener_id):
+                            # Never registered with the server, nothing to undo
+                            return
+                        self.ws_manager.send_command_nowait(
                             'UNREGISTER_CDP_LISTENER',
                             {
                                 'tabId': self.tab_id,
                                 'eventName': event_name,
                                 'listenerId': listener_id
-                            },
-                            timeout=5.0
-                        ))
+                            }
+                        )
             except ValueError:
                 pass
 
+    def _drop_pending_reg(self, listener_id: str) -> bool:
+        """Take a registration out of the unsent batch; False if already sent"""
+        for i, reg in enumerate(self._pending_regs):
+            if reg['listenerId'] == listener_id:
+                del self._pending_regs[i]
+                return True
+        return False
+
     def is_connected(self) -> bool:
         """Check if session is connected"""
         return self.ws_manager.ws.open
 
     async def detach(self):
-        """Detach CDP session (no-op, cleanup handled by manager)"""
-        pass
+        """Release a reference; the last one unregisters every listener"""
+        self._refs -= 1
+        if self._refs > 0:
+            return
+
+        if self._context is not None:
+            self._context._release_cdp_session(self)
+
+        if self._reg_flush_handle is not None:
+            self._reg_flush_handle.cancel()
+            self._reg_flush_handle = None
+        unsent = {reg['listenerId'] for reg in self._pending_regs}
+        self._pending_regs = []
+
+        for event_name, callbacks in self._listeners.items():
+            for callback in callbacks:
+                self.ws_manager.unregister_event_handler(event_name, callback)
+        self._listeners = {}
+
+        listener_ids, self._listener_ids = self._listener_ids, {}
+        results = await asyncio.gather(*(
+            send_extension_command(
+                self.ws_manager,
+                'UNREGISTER_CDP_LISTENER',
+                {
+                    'tabId': self.tab_id,
+                    'eventName': event_name,
+                    'listenerId': listener_id
+                },
+                timeout=5.0
+            )
+            for event_name, listener_id in listener_ids.items()
+            if listener_id not in unsent
+        ), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error unregistering CDP listener: {result}")
+
+
+# Load states map to the CDP event that signals them and the
+# document.readyState values that mean they have already been reached
+_LOAD_STATE_EVENTS = {
+    'load': 'Page.loadEventFired',
+    'domcontentloaded': 'Page.domContentEventFired',
+    'networkidle': 'Page.loadEventFired',
+}
+_LOAD_STATE_READY_STATES = {
+    'load': ('complete',),
+    'domcontentloaded': ('interactive', 'complete'),
+    'networkidle': ('complete',),
+}
+_READY_STATE_JS = "() => document.readyState"
+
+
+def _normalize_url(url: Optional[str]) -> Optional[str]:
+    """URL as Chrome reports it: lowercase host, '/' for an empty path"""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(netloc=parts.netloc.lower(), path=parts.path or '/'))
+
+
+class _NavigationWatcher:
+    """Follows the lifecycle of the navigations ExtensionPage.goto starts
+
+    Set up once per page and armed for each goto. Load events only count
+    once the main frame has committed the new document, so a late event from
+    the page being replaced can't resolve it; navigations in other frames
+    are ignored.
+    """
+
+    __slots__ = (
+        'ws_manager',
+        'tab_id',
+        'states',
+        '_url',
+        '_main_frame_id',
+        '_committed',
+        '_handlers',
+        '_listener_ids',
+    )
+
+    def __init__(self, ws_manager: WebSocketManager, tab_id: int):
+        self.ws_manager = ws_manager
+        self.tab_id = tab_id
+        self.states = None  # state -> future for the armed navigation
+        self._url = None
+        self._main_frame_id = None
+        self._committed = False
+        self._handlers = {
+            'Page.frameNavigated': self._on_frame_navigated,
+            'Page.navigatedWithinDocument': self._on_navigated_within_document,
+            'Page.domContentEventFired': self._on_dom_content_event,
+            'Page.loadEventFired': self._on_load_event,
+        }
+        self._listener_ids = {}
+
+    async def start(self):
+        """Listen for the lifecycle events and find the main frame"""
+        for event_name, handler in self._handlers.items():
+            self.ws_manager.register_event_handler(event_name, handler)
+        self._listener_ids = {event_name: str(uuid.uuid4()) for event_name in self._handlers}
+
+        _, _, frame_tree = await asyncio.gather(
+            send_extension_command(
+                self.ws_manager,
+                'REGISTER_CDP_LISTENERS',
+                {
+                    'tabId': self.tab_id,
+                    'listeners': [
+                        {'eventName': event_name, 'listenerId': listener_id}
+                        for event_name, listener_id in self._listener_ids.items()
+                    ]
+                },
+                timeout=5.0
+            ),
+            # Page domain events are only emitted once the domain is enabled
+            send_extension_command(
+                self.ws_manager,
+                'CDP_COMMAND',
+                {'tabId': self.tab_id, 'method': 'Page.enable', 'params': {}},
+                timeout=5.0
+            ),
+            send_extension_command(
+                self.ws_manager,
+                'CDP_COMMAND',
+                {'tabId': self.tab_id, 'method': 'Page.getFrameTree', 'params': {}},
+                timeout=5.0
+            ),
+        )
+        # A main-frame frameNavigated seen meanwhile is newer than the tree
+        if self._main_frame_id is None:
+            self._main_frame_id = (frame_tree or {}).get('frameTree', {}).get('frame', {}).get('id')
+
+    def arm(self, url: str):
+        """Follow a navigation to url; call before issuing it"""
+        loop = asyncio.get_running_loop()
+        previous = self.states or {}
+        # Whoever still waits on an earlier navigation now waits on this one
+        self.states = {
+            state: future if future is not None and not future.done() else loop.create_future()
+            for state, future in (
+                ('domcontentloaded', previous.get('domcontentloaded')),
+                ('load', previous.get('load')),
+            )
+        }
+        self._url = _normalize_url(url)
+        self._committed = False
+
+    def disarm(self):
+        """Stop following the current navigation"""
+        self.states = None
+        self._url = None
+        self._committed = False
+
+    def stop(self):
+        """Stop listening (safe to call more than once)"""
+        self.disarm()
+        for event_name, handler in self._handlers.items():
+            self.ws_manager.unregister_event_handler(event_name, handler)
+        listener_ids, self._listener_ids = self._listener_ids, {}
+        for event_name, listener_id in listener_ids.items():
+            self.ws_manager.send_command_nowait(
+                'UNREGISTER_CDP_LISTENER',
+                {
+                    'tabId': self.tab_id,
+                    'eventName': event_name,
+                    'listenerId': listener_id
+                }
+            )
+
+    def _resolve(self, *states: str):
+        for state in states:
+            future = self.states[state]
+            if not future.done():
+                future.set_result(None)
+
+    def _on_frame_navigated(self, params: dict):
+        frame = params.get('frame', {})
+        if frame.get('parentId'):
+            return
+        self._main_frame_id = frame.get('id') or self._main_frame_id
+        if self.states is not None:
+            self._committed = True
+
+    def _on_navigated_within_document(self, params: dict):
+        # Fragment and history API navigations never load a new document
+        if (
+            self.states is not None
+            and not self._committed
+            and params.get('frameId') == self._main_frame_id
+            and _normalize_url(params.get('url')) == self._url
+        ):
+            self._resolve('domcontentloaded', 'load')
+            self.disarm()
+
+    def _on_dom_content_event(self, params: dict):
+        if self.states is not None and self._committed:
+            self._resolve('domcontentloaded')
+
+    def _on_load_event(self, params: dict):
+        if self.states is not None and self._committed:
+            self._resolve('domcontentloaded', 'load')
+            self.disarm()
 
 
 class ExtensionPage:
     """Mimics Playwright Page for extension mode"""
 
+    # __weakref__: StagehandContext.page_map is keyed weakly by page
+    __slots__ = ('ws_manager', 'tab_id', 'logger', '_url', '_context', '_navigation', '__weakref__')
+
     def __init__(self, ws_manager: WebSocketManager, tab_id: int, logger: StagehandLogger, context=None):
         self.ws_manager = ws_manager
         self.tab_id = tab_id
         self.logger = logger
         self._url = None
         self._context = context
+        self._navigation = None  # _NavigationWatcher, set up by the first goto
 
     async def goto(self, url: str, **options):
         """Navigate to URL"""
-        result = await send_extension_command(
-            self.ws_manager,
-            'NAVIGATE',
-            {
-                'tabId': self.tab_id,
-                'url': url,
-                'options': options
-            }
-        )
+        if options.get('waitUntil'):
+            self._disarm_navigation()
+        else:
+            # The extension returns as soon as the navigation starts; follow
+            # it so wait_for_load_state waits for this navigation rather
+            # than reading the old document's state
+            try:
+                if self._navigation is None:
+                    self._navigation = _NavigationWatcher(self.ws_manager, self.tab_id)
+                    await self._navigation.start()
+                self._navigation.arm(url)
+            except Exception as e:
+                self._stop_navigation()
+                self.logger.debug(f"Not tracking navigation to {url}: {e}")
+
+        try:
+            result = await send_extension_command(
+                self.ws_manager,
+                'NAVIGATE',
+                {
+                    'tabId': self.tab_id,
+                    'url': url,
+                    'options': options
+                }
+            )
+        except Exception:
+            self._disarm_navigation()
+            raise
         self._url = url
         return result
 
+    def _disarm_navigation(self):
+        if self._navigation is not None:
+            self._navigation.disarm()
+
+    def _stop_navigation(self):
+        if self._navigation is not None:
+            self._navigation.stop()
+            self._navigation = None
+
     async def url(self) -> str:
         """Get current URL"""
         if self._url:
             return self._url
         # Get from tab info
-        tab_info = await send_extension_command(
-            self.ws_manager,
-            'GET_TAB_INFO',
-            {'tabId': self.tab_id}
-        )
+        tab_info = await self.ws_manager.send_tab_command('GET_TAB_INFO', self.tab_id)
         return tab_info.get('url', '')
 
     async def title(self) -> str:
         """Get page title"""
-        tab_info = await send_extension_command(
-            self.ws_manager,
-            'GET_TAB_INFO',
-            {'tabId': self.tab_id}
-        )
+        tab_info = await self.ws_manager.send_tab_command('GET_TAB_INFO', self.tab_id)
         return tab_info.get('title', '')
 
     async def evaluate(self, script: str, *args):
@@ -799,9 +1260,81 @@ class ExtensionPage:
         return result
 
     async def wait_for_load_state(self, state: str = "load", **options):
-        """Wait for load state (no-op for now, could implement with navigation listener)"""
-        # For extension mode, we rely on navigation completion from the extension
-        await asyncio.sleep(0.5)  # Small delay to ensure page is ready
+        """Wait until the tab reaches the given load state"""
+        # Milliseconds as in Playwright: None means the default, 0 no timeout
+        timeout = options.get('timeout')
+        timeout = 30.0 if timeout is None else (timeout / 1000 or None)
+
+        # A navigation from goto is still in flight: wait for its document
+        navigation = self._navigation
+        if navigation is not None and navigation.states is not None:
+            future = navigation.states['domcontentloaded' if state == 'domcontentloaded' else 'load']
+            if not future.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Timed out after {timeout}s waiting for load state '{state}'") from None
+                return
+
+        event_name = _LOAD_STATE_EVENTS.get(state, 'Page.loadEventFired')
+        ready_states = _LOAD_STATE_READY_STATES.get(state, ('complete',))
+
+        # Already there: one round-trip instead of a listener setup
+        if await self._ready_state() in ready_states:
+            return
+
+        fired = asyncio.get_running_loop().create_future()
+
+        def on_event(params):
+            if not fired.done():
+                fired.set_result(None)
+
+        listener_id = str(uuid.uuid4())
+        self.ws_manager.register_event_handler(event_name, on_event)
+        try:
+            await send_extension_command(
+                self.ws_manager,
+                'REGISTER_CDP_LISTENER',
+                {
+                    'tabId': self.tab_id,
+                    'eventName': event_name,
+                    'listenerId': listener_id
+                },
+                timeout=5.0
+            )
+            # Page domain events are only emitted once the domain is enabled
+            await send_extension_command(
+                self.ws_manager,
+                'CDP_COMMAND',
+                {'tabId': self.tab_id, 'method': 'Page.enable', 'params': {}},
+                timeout=5.0
+            )
+
+            # The page may have finished loading while the listener was set up
+            if await self._ready_state() in ready_states:
+                return
+
+            try:
+                await asyncio.wait_for(fired, timeout=timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Timed out after {timeout}s waiting for load state '{state}'") from None
+        finally:
+            self.ws_manager.unregister_event_handler(event_name, on_event)
+            self.ws_manager.send_command_nowait(
+                'UNREGISTER_CDP_LISTENER',
+                {
+                    'tabId': self.tab_id,
+                    'eventName': event_name,
+                    'listenerId': listener_id
+                }
+            )
+
+    async def _ready_state(self) -> Optional[str]:
+        """Get document.readyState, or None if the page can't be scripted"""
+        try:
+            return await self.evaluate(_READY_STATE_JS)
+        except Exception:
+            return None
 
     async def add_init_script(self, script: str):
         """Add initialization script (injected via content script in extension mode)"""
@@ -831,81 +1364,111 @@ class ExtensionPage:
 
     async def close(self):
         """Close the page"""
-        await send_extension_command(
-            self.ws_manager,
-            'CLOSE_TAB',
-            {'tabId': self.tab_id}
-        )
+        self._stop_navigation()
+        await self.ws_manager.send_tab_command('CLOSE_TAB', self.tab_id)
+
+
+# Locator scripts are constant function sources that take the XPath (and any
+# values) as arguments: nothing user-supplied is spliced into the source, and
+# the page can reuse the compiled function across calls
+_LOCATE_XPATH_JS = """document.evaluate(
+            xpath,
+            document,
+            null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE,
+            null
+        ).singleNodeValue"""
+
+_LOCATOR_CLICK_JS = f"""
+    function(xpath) {{
+        const element = {_LOCATE_XPATH_JS};
+        if (element) {{
+            element.click();
+            return true;
+        }}
+        return false;
+    }}
+    """
+
+# Clicks every XPath in one evaluation; returns whether each was found
+_LOCATOR_CLICK_ALL_JS = f"""
+    function(xpaths) {{
+        return xpaths.map(xpath => {{
+            const element = {_LOCATE_XPATH_JS};
+            if (element) {{
+                element.click();
+                return true;
+            }}
+            return false;
+        }});
+    }}
+    """
+
+_LOCATOR_FILL_JS = f"""
+    function(xpath, value) {{
+        const element = {_LOCATE_XPATH_JS};
+        if (element) {{
+            element.value = value;
+            element.dispatchEvent(new Event('input', {{ bubbles: true }}));
+            element.dispatchEvent(new Event('change', {{ bubbles: true }}));
+            return true;
+        }}
+        return false;
+    }}
+    """
+
+# %s is the caller's function, which receives the element and any extra args
+_LOCATOR_EVALUATE_JS = f"""
+    function(xpath, ...args) {{
+        const element = {_LOCATE_XPATH_JS};
+        if (element) {{
+            return (%s)(element, ...args);
+        }}
+        return null;
+    }}
+    """
 
 
 class ExtensionLocator:
     """Mimics Playwright Locator for extension mode"""
 
+    __slots__ = ('ws_manager', 'tab_id', 'selector', 'logger')
+
     def __init__(self, ws_manager: WebSocketManager, tab_id: int, selector: str, logger: StagehandLogger):
         self.ws_manager = ws_manager
         self.tab_id = tab_id
         self.selector = selector
         self.logger = logger
 
-    async def click(self, **options):
-        """Click the element"""
-        script = f"""
-        (function() {{
-            const element = document.evaluate(
-                '{self.selector.replace("xpath=", "")}',
-                document,
-                null,
-                XPathResult.FIRST_ORDERED_NODE_TYPE,
-                null
-            ).singleNodeValue;
-            if (element) {{
-                element.click();
-                return true;
-            }}
-            return false;
-        }})()
-        """
-        result = await send_extension_command(
+    @property
+    def xpath(self) -> str:
+        """The selector without its xpath= prefix"""
+        return self.selector.replace("xpath=", "")
+
+    async def _evaluate(self, script: str, args: list) -> Any:
+        """Run a locator script in the tab"""
+        return await send_extension_command(
             self.ws_manager,
             'EVALUATE',
             {
                 'tabId': self.tab_id,
                 'script': script,
-                'args': []
+                'args': args
             }
         )
-        return result
+
+    async def click(self, **options):
+        """Click the element"""
+        return await self._evaluate(_LOCATOR_CLICK_JS, [self.xpath])
+
+    async def click_all(self, selectors: list) -> list:
+        """Click several elements in one round-trip, returning whether each was found"""
+        xpaths = [selector.replace("xpath=", "") for selector in selectors]
+        return await self._evaluate(_LOCATOR_CLICK_ALL_JS, [xpaths])
 
     async def fill(self, value: str, **options):
         """Fill the element with text"""
-        script = f"""
-        (function() {{
-            const element = document.evaluate(
-                '{self.selector.replace("xpath=", "")}',
-                document,
-                null,
-                XPathResult.FIRST_ORDERED_NODE_TYPE,
-                null
-            ).singleNodeValue;
-            if (element) {{
-                element.value = '{value}';
-                element.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                element.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                return true;
-            }}
-            return false;
-        }})()
-        """
-        result = await send_extension_command(
-            self.ws_manager,
-            'EVALUATE',
-            {
-                'tabId': self.tab_id,
-                'script': script,
-                'args': []
-            }
-        )
-        return result
+        return await self._evaluate(_LOCATOR_FILL_JS, [self.xpath, value])
 
     @property
     def first(self):
@@ -914,28 +1477,6 @@ class ExtensionLocator:
 
     async def evaluate(self, script: str, *args):
         """Evaluate JavaScript on the located element"""
-        full_script = f"""
-        (function() {{
-            const element = document.evaluate(
-                '{self.selector.replace("xpath=", "")}',
-                document,
-                null,
-                XPathResult.FIRST_ORDERED_NODE_TYPE,
-                null
-            ).singleNodeValue;
-            if (element) {{
-                return ({script})(element);
-            }}
-            return null;
-        }})()
-        """
-        result = await send_extension_command(
-            self.ws_manager,
-            'EVALUATE',
-            {
-                'tabId': self.tab_id,
-                'script': full_script,
-                'args': list(args)
-            }
+        return await self._evaluate(
+            _LOCATOR_EVALUATE_JS % script, [self.xpath, *args]
         )
-        return result
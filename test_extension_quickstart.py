@@ -65,4 +65,11 @@ async def main():
         await stagehand.close()
 
 if __name__ == "__main__":
+    # Use uvloop when available (not supported on Windows, which keeps the default loop)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(main())
@@ -95,6 +95,13 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Use uvloop when available (not supported on Windows, which keeps the default loop)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
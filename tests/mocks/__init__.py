@@ -3,6 +3,7 @@
 from .mock_llm import MockLLMClient, MockLLMResponse
 from .mock_browser import MockBrowser, MockBrowserContext, MockPlaywrightPage
 from .mock_server import MockStagehandServer
+from .mock_websocket import MockWebSocket
 
 __all__ = [
     "MockLLMClient",
@@ -10,5 +11,6 @@ __all__ = [
     "MockBrowser",
     "MockBrowserContext",
     "MockPlaywrightPage",
-    "MockStagehandServer"
+    "MockStagehandServer",
+    "MockWebSocket"
 ] 
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Mock extension server websocket for testing the extension-mode client"""
+
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+
+class MockWebSocket:
+    """Mock client websocket fed with frames by the test
+
+    With a responder, every command that carries an id is answered with a
+    successful RESPONSE holding responder(command); a responder returning
+    NO_REPLY leaves the command unanswered.
+    """
+
+    NO_REPLY = object()
+
+    def __init__(self, responder: Optional[Callable[[dict[str, Any]], Any]] = None):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.responder = responder
+        self.open = True
+
+    async def send(self, payload):
+        command = json.loads(payload)
+        self.sent.append(command)
+        if self.responder is not None and "id" in command:
+            result = self.responder(command)
+            if result is not self.NO_REPLY:
+                self.receive({"id": command["id"], "type": "RESPONSE", "success": True, "result": result})
+
+    def receive(self, message):
+        self.incoming.put_nowait(json.dumps(message))
+
+    def disconnect(self):
+        self.open = False
+        self.incoming.put_nowait(None)
+
+    def sent_types(self):
+        """Types of the commands sent so far, in order"""
+        return [command["type"] for command in self.sent]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
@@ -0,0 +1,103 @@
+"""Test CDP listener registration batching in ExtensionCDPSession"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from stagehand.browser import ExtensionCDPSession, WebSocketManager
+from tests.mocks.mock_websocket import MockWebSocket
+
+
+@pytest.fixture
+async def session():
+    """CDP session on a started manager whose commands all succeed"""
+    manager = WebSocketManager(MockWebSocket(responder=lambda command: {}), MagicMock())
+    await manager.start()
+    yield ExtensionCDPSession(manager, tab_id=3, logger=MagicMock())
+    await manager.close()
+
+
+async def settle():
+    """Let queued registrations flush and background sends go out"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestListenerRegistration:
+    """Test how listeners are registered with and removed from the server"""
+
+    @pytest.mark.asyncio
+    async def test_registrations_are_batched(self, session):
+        """Test that listeners added in one iteration go out as one command"""
+        for event in ("Page.loadEventFired", "Page.frameNavigated", "Network.requestWillBeSent"):
+            session.on(event, lambda params: None)
+        await settle()
+
+        [command] = session.ws_manager.ws.sent
+        assert command["type"] == "REGISTER_CDP_LISTENERS"
+        assert command["tabId"] == 3
+        assert [listener["eventName"] for listener in command["listeners"]] == [
+            "Page.loadEventFired", "Page.frameNavigated", "Network.requestWillBeSent"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_second_callback_is_not_registered_again(self, session):
+        """Test that a second callback for an event reuses its listener"""
+        calls = []
+        session.on("Page.loadEventFired", lambda params: calls.append(1))
+        await settle()
+        session.on("Page.loadEventFired", lambda params: calls.append(2))
+        await settle()
+
+        assert session.ws_manager.ws.sent_types() == ["REGISTER_CDP_LISTENERS"]
+
+        session.ws_manager.ws.receive({"type": "CDP_EVENT", "method": "Page.loadEventFired", "params": {}})
+        await settle()
+        assert calls == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_remove_before_flush_sends_nothing(self, session):
+        """Test that a listener removed before its batch went out is never sent"""
+        def callback(params):
+            pass
+
+        session.on("Page.loadEventFired", callback)
+        session.on("Page.frameNavigated", callback)
+        session.remove_listener("Page.loadEventFired", callback)
+        await settle()
+
+        [command] = session.ws_manager.ws.sent
+        assert command["type"] == "REGISTER_CDP_LISTENERS"
+        assert [listener["eventName"] for listener in command["listeners"]] == ["Page.frameNavigated"]
+
+    @pytest.mark.asyncio
+    async def test_remove_after_flush_unregisters_in_order(self, session):
+        """Test that UNREGISTER follows the REGISTER it undoes"""
+        def callback(params):
+            pass
+
+        session.on("Page.loadEventFired", callback)
+        await settle()
+        session.remove_listener("Page.loadEventFired", callback)
+        await settle()
+
+        register, unregister = session.ws_manager.ws.sent
+        assert register["type"] == "REGISTER_CDP_LISTENERS"
+        assert unregister["type"] == "UNREGISTER_CDP_LISTENER"
+        assert unregister["listenerId"] == register["listeners"][0]["listenerId"]
+        assert "Page.loadEventFired" not in session.ws_manager.event_handlers
+
+    @pytest.mark.asyncio
+    async def test_detach_skips_unsent_registrations(self, session):
+        """Test that detach only unregisters listeners the server knows about"""
+        session._refs = 1
+        session.on("Page.loadEventFired", lambda params: None)
+        await settle()
+        session.on("Page.frameNavigated", lambda params: None)
+        await session.detach()
+        await settle()
+
+        assert session.ws_manager.ws.sent_types() == ["REGISTER_CDP_LISTENERS", "UNREGISTER_CDP_LISTENER"]
+        assert session.ws_manager.ws.sent[1]["eventName"] == "Page.loadEventFired"
+        assert not session.ws_manager.event_handlers
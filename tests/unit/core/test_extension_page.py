@@ -0,0 +1,172 @@
+"""Test navigation tracking and load state waits in ExtensionPage"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from stagehand.browser import ExtensionPage, WebSocketManager
+from tests.mocks.mock_websocket import MockWebSocket
+
+
+class FakeTab:
+    """Answers the commands an ExtensionPage sends for one tab"""
+
+    def __init__(self):
+        self.ready_state = "complete"
+
+    def respond(self, command):
+        if command["type"] == "EVALUATE":
+            return self.ready_state
+        if command["type"] == "CDP_COMMAND" and command["method"] == "Page.getFrameTree":
+            return {"frameTree": {"frame": {"id": "main"}}}
+        return {}
+
+
+@pytest.fixture
+def tab():
+    """Tab that has finished loading"""
+    return FakeTab()
+
+
+@pytest.fixture
+async def page(tab):
+    """Page on a started manager backed by the fake tab"""
+    manager = WebSocketManager(MockWebSocket(responder=tab.respond), MagicMock())
+    await manager.start()
+    yield ExtensionPage(manager, tab_id=1, logger=MagicMock())
+    await manager.close()
+
+
+def emit(page, method, params=None):
+    """Deliver a CDP event from the page's tab"""
+    page.ws_manager.ws.receive({"type": "CDP_EVENT", "tabId": 1, "method": method, "params": params or {}})
+
+
+async def settle():
+    """Let the receiver dispatch delivered frames"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestNavigationTracking:
+    """Test waiting for the document a goto navigates to"""
+
+    @pytest.mark.asyncio
+    async def test_watcher_is_set_up_once(self, page):
+        """Test that later gotos only send the navigation"""
+        await page.goto("https://example.com/")
+        await page.goto("https://example.com/next")
+
+        assert sorted(page.ws_manager.ws.sent_types()[:3]) == [
+            "CDP_COMMAND", "CDP_COMMAND", "REGISTER_CDP_LISTENERS"
+        ]
+        assert page.ws_manager.ws.sent_types()[3:] == ["NAVIGATE", "NAVIGATE"]
+
+    @pytest.mark.asyncio
+    async def test_load_after_commit(self, page, tab):
+        """Test that the wait ends at the new document's load, not the old readyState"""
+        tab.ready_state = "complete"
+        await page.goto("https://example.com/")
+        dcl = asyncio.create_task(page.wait_for_load_state("domcontentloaded"))
+        load = asyncio.create_task(page.wait_for_load_state())
+
+        emit(page, "Page.frameNavigated", {"frame": {"id": "main", "url": "https://example.com/"}})
+        emit(page, "Page.domContentEventFired")
+        await settle()
+        assert dcl.done() and not load.done()
+
+        emit(page, "Page.loadEventFired")
+        await asyncio.wait_for(load, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_stale_load_before_commit_is_ignored(self, page):
+        """Test that a load event from the replaced document doesn't end the wait"""
+        await page.goto("https://example.com/")
+        load = asyncio.create_task(page.wait_for_load_state())
+
+        emit(page, "Page.loadEventFired")
+        emit(page, "Page.frameNavigated", {"frame": {"id": "child", "parentId": "main"}})
+        emit(page, "Page.loadEventFired")
+        await settle()
+        assert not load.done()
+
+        emit(page, "Page.frameNavigated", {"frame": {"id": "main"}})
+        emit(page, "Page.loadEventFired")
+        await asyncio.wait_for(load, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_same_document_navigation(self, page):
+        """Test that a fragment navigation of the main frame to the goto URL ends the wait"""
+        await page.goto("https://example.com#section")
+        load = asyncio.create_task(page.wait_for_load_state())
+
+        emit(page, "Page.navigatedWithinDocument", {"frameId": "child", "url": "https://example.com/#section"})
+        emit(page, "Page.navigatedWithinDocument", {"frameId": "main", "url": "https://example.com/#other"})
+        await settle()
+        assert not load.done()
+
+        emit(page, "Page.navigatedWithinDocument", {"frameId": "main", "url": "https://example.com/#section"})
+        await asyncio.wait_for(load, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, page):
+        """Test that a navigation that never loads times out"""
+        await page.goto("https://example.com/")
+
+        with pytest.raises(TimeoutError):
+            await page.wait_for_load_state(timeout=50)
+
+    @pytest.mark.asyncio
+    async def test_timeout_mapping(self, page):
+        """Test that timeout=None uses the default and timeout=0 waits without limit"""
+        timeouts = []
+        wait_for = asyncio.wait_for
+
+        def record(awaitable, timeout):
+            timeouts.append(timeout)
+            return wait_for(awaitable, timeout)
+
+        for timeout in (None, 0):
+            await page.goto("https://example.com/")
+            with patch("stagehand.browser.asyncio.wait_for", side_effect=record):
+                wait = asyncio.create_task(page.wait_for_load_state(timeout=timeout))
+                await settle()
+                emit(page, "Page.frameNavigated", {"frame": {"id": "main"}})
+                emit(page, "Page.loadEventFired")
+                await wait_for(wait, timeout=1)
+
+        assert timeouts == [30.0, None]
+
+
+class TestLoadStateWithoutNavigation:
+    """Test waiting for a load state when no goto is being tracked"""
+
+    @pytest.mark.asyncio
+    async def test_ready_state_fast_path(self, page, tab):
+        """Test that a page already loaded costs one readyState check"""
+        tab.ready_state = "interactive"
+
+        await page.wait_for_load_state("domcontentloaded")
+
+        assert page.ws_manager.ws.sent_types() == ["EVALUATE"]
+
+    @pytest.mark.asyncio
+    async def test_fallback_listener(self, page, tab):
+        """Test that a loading page is waited on with a one-shot listener"""
+        tab.ready_state = "loading"
+        wait = asyncio.create_task(page.wait_for_load_state())
+        for _ in range(100):
+            if page.ws_manager.ws.sent_types().count("EVALUATE") == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert not wait.done()
+
+        emit(page, "Page.loadEventFired")
+        await asyncio.wait_for(wait, timeout=1)
+        await settle()
+
+        assert page.ws_manager.ws.sent_types() == [
+            "EVALUATE", "REGISTER_CDP_LISTENER", "CDP_COMMAND", "EVALUATE", "UNREGISTER_CDP_LISTENER"
+        ]
+        assert "Page.loadEventFired" not in page.ws_manager.event_handlers
@@ -0,0 +1,246 @@
+"""Test request routing, timeouts and session lifecycle in the extension server"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# The server ships as a standalone script next to the package
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "server"))
+
+import extension_server  # noqa: E402
+from extension_server import ExtensionServer, Session  # noqa: E402
+
+
+def make_websocket(write_buffer_size=0):
+    """Create a mock websocket that records the frames sent on it"""
+    websocket = MagicMock()
+    websocket.sent = []
+    websocket.send = AsyncMock(side_effect=websocket.sent.append)
+    websocket.close = AsyncMock()
+    websocket.transport.get_write_buffer_size.return_value = write_buffer_size
+    return websocket
+
+
+def make_session(server, session_id, **kwargs):
+    """Create a session registered with the server as connected"""
+    session = Session(session_id=session_id, websocket=make_websocket(), **kwargs)
+    server.sessions[session_id] = session
+    return session
+
+
+def queued_frames(session):
+    """Drain and decode the frames queued for a session"""
+    frames = []
+    while not session.out_queue.empty():
+        frames.append(json.loads(session.out_queue.get_nowait()))
+    return frames
+
+
+@pytest.fixture
+async def server():
+    """Server with a connected mock extension and its writer running"""
+    server = ExtensionServer()
+    server.extension_ws = make_websocket()
+    server._ext_queue = asyncio.Queue()
+    writer = asyncio.create_task(
+        server._extension_writer(server.extension_ws, server._ext_queue)
+    )
+    yield server
+    writer.cancel()
+
+
+async def wait_for_extension_frames(server, count):
+    """Wait until the extension has been sent at least count frames"""
+    for _ in range(100):
+        if len(server.extension_ws.sent) >= count:
+            return [json.loads(frame) for frame in server.extension_ws.sent]
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"extension got {len(server.extension_ws.sent)} frames, expected {count}")
+
+
+class TestRequestRouting:
+    """Test forwarding requests and routing the extension's responses"""
+
+    @pytest.mark.asyncio
+    async def test_response_uses_client_id(self, server):
+        """Test that the reply carries the client's id, not the wire id"""
+        session = make_session(server, "a")
+
+        task = asyncio.create_task(
+            server.forward_with_response(session, 7, {"id": 7, "type": "GET_TAB_INFO"})
+        )
+        [request] = await wait_for_extension_frames(server, 1)
+        await server.route_response_to_python(
+            request["id"], {"id": request["id"], "type": "RESPONSE", "success": True, "result": "ok"}
+        )
+        await task
+
+        assert queued_frames(session) == [
+            {"id": 7, "type": "RESPONSE", "result": "ok", "success": True}
+        ]
+        assert not server._pending
+        assert not session.pending_requests
+
+    @pytest.mark.asyncio
+    async def test_same_client_ids_get_distinct_wire_ids(self, server):
+        """Test that two clients' request 1 don't share a wire id"""
+        a = make_session(server, "a")
+        b = make_session(server, "b")
+
+        tasks = [
+            asyncio.create_task(server.forward_with_response(session, 1, {"id": 1, "type": "X"}))
+            for session in (a, b)
+        ]
+        first, second = await wait_for_extension_frames(server, 2)
+        assert first["id"] != second["id"]
+
+        for task in tasks:
+            task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_late_reply_does_not_reach_other_client(self, server):
+        """Test that a reply to a timed-out request isn't delivered to a reused id"""
+        a = make_session(server, "a")
+        b = make_session(server, "b")
+
+        task_a = asyncio.create_task(server.forward_with_response(a, 1, {"id": 1, "type": "X"}))
+        [request_a] = await wait_for_extension_frames(server, 1)
+        server.handle_request_timeout(a, request_a["id"])
+        await task_a
+        assert queued_frames(a)[0]["success"] is False
+
+        task_b = asyncio.create_task(server.forward_with_response(b, 1, {"id": 1, "type": "X"}))
+        _, request_b = await wait_for_extension_frames(server, 2)
+
+        # The extension answers A's request late, then B's
+        await server.route_response_to_python(
+            request_a["id"], {"id": request_a["id"], "type": "RESPONSE", "success": True, "result": "result-for-A"}
+        )
+        await server.route_response_to_python(
+            request_b["id"], {"id": request_b["id"], "type": "RESPONSE", "success": True, "result": "result-for-B"}
+        )
+        await task_b
+
+        assert queued_frames(b) == [
+            {"id": 1, "type": "RESPONSE", "result": "result-for-B", "success": True}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_frames_reach_extension_in_order(self, server):
+        """Test that fire-and-forget frames aren't overtaken by a later request"""
+        session = make_session(server, "a")
+
+        for n in range(5):
+            note = json.dumps({"type": "NOTE", "n": n})
+            await server.handle_python_message(session, note, json.loads(note))
+        request = json.dumps({"id": 1, "type": "REQ"})
+        task = asyncio.create_task(server.handle_python_message(session, request, json.loads(request)))
+
+        frames = await wait_for_extension_frames(server, 6)
+        assert [frame["type"] for frame in frames] == ["NOTE"] * 5 + ["REQ"]
+        assert [frame["n"] for frame in frames[:5]] == list(range(5))
+        task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_failed_send_fails_request(self, server):
+        """Test that a request the extension never received fails immediately"""
+        session = make_session(server, "a")
+        server.extension_ws.send.side_effect = ConnectionError("gone")
+
+        await asyncio.wait_for(
+            server.forward_with_response(session, 1, {"id": 1, "type": "X"}), timeout=1
+        )
+
+        [reply] = queued_frames(session)
+        assert reply["success"] is False and "gone" in reply["error"]
+        assert not server._pending
+
+
+class TestTimeouts:
+    """Test the timeout heap and its sweeper"""
+
+    @pytest.mark.asyncio
+    async def test_sweeper_expires_pending_request(self, server):
+        """Test that an unanswered request times out and is cleaned up"""
+        server.request_timeout = 0.05
+        server.timeout_sweep_interval = 0.01
+        sweeper = asyncio.create_task(server._sweep_timeouts())
+        session = make_session(server, "a")
+
+        try:
+            await asyncio.wait_for(
+                server.forward_with_response(session, 1, {"id": 1, "type": "X"}), timeout=1
+            )
+        finally:
+            sweeper.cancel()
+
+        [reply] = queued_frames(session)
+        assert reply["id"] == 1
+        assert reply["success"] is False and "timed out" in reply["error"]
+        assert not server._pending
+        assert not server._timeout_heap
+
+    @pytest.mark.asyncio
+    async def test_sweeper_skips_answered_requests(self, server):
+        """Test that heap entries for answered requests are discarded"""
+        server.request_timeout = 0.05
+        server.timeout_sweep_interval = 0.01
+        sweeper = asyncio.create_task(server._sweep_timeouts())
+        session = make_session(server, "a")
+
+        task = asyncio.create_task(server.forward_with_response(session, 1, {"id": 1, "type": "X"}))
+        [request] = await wait_for_extension_frames(server, 1)
+        await server.route_response_to_python(
+            request["id"], {"id": request["id"], "type": "RESPONSE", "success": True, "result": 1}
+        )
+        await task
+        await asyncio.sleep(0.1)
+        sweeper.cancel()
+
+        assert queued_frames(session) == [{"id": 1, "type": "RESPONSE", "result": 1, "success": True}]
+        assert not server._timeout_heap
+
+
+class TestSessionClose:
+    """Test cleaning up after a client disconnects"""
+
+    @pytest.mark.asyncio
+    async def test_close_fails_pending_requests(self):
+        """Test that a closed session's requests fail and its later frames are dropped"""
+        server = ExtensionServer()
+        session = Session(session_id="a", websocket=make_websocket())
+        future = asyncio.get_running_loop().create_future()
+        pending = extension_server.PendingRequest(future=future)
+        session.pending_requests[1] = pending
+        server._pending[1] = (session, pending)
+
+        server._close_session(session)
+
+        assert not server._pending and not session.pending_requests
+        assert isinstance(future.exception(), Exception)
+
+        # Frames for a session that isn't connected are dropped
+        server.send_to_session(session, '{"id":1,"type":"RESPONSE"}')
+        assert session.out_queue.empty()
+
+
+class TestSlowConsumers:
+    """Test disconnecting sessions that can't keep up with broadcasts"""
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_closed_once(self):
+        """Test that repeated broadcasts close an over-limit session only once"""
+        server = ExtensionServer()
+        session = make_session(server, "a")
+        session.websocket.transport.get_write_buffer_size.return_value = server.max_write_buffer + 1
+
+        for _ in range(3):
+            server.broadcast_to_sessions([session], '{"type":"CDP_EVENT"}')
+        await asyncio.sleep(0)
+
+        assert session.websocket.close.await_count == 1
+        assert "a" not in server.sessions
@@ -0,0 +1,139 @@
+"""Test WebSocketManager response routing and lifecycle in extension mode"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from stagehand.browser import WebSocketManager
+from tests.mocks.mock_websocket import MockWebSocket
+
+
+@pytest.fixture
+async def manager():
+    """Started manager on a mock websocket"""
+    manager = WebSocketManager(MockWebSocket(), MagicMock())
+    await manager.start()
+    yield manager
+    await manager.close()
+
+
+async def next_request(manager):
+    """Wait for the next command the manager sends"""
+    for _ in range(100):
+        if manager.ws.sent:
+            return manager.ws.sent.pop(0)
+        await asyncio.sleep(0.01)
+    raise AssertionError("no command was sent")
+
+
+class TestResponseRouting:
+    """Test matching responses to commands"""
+
+    @pytest.mark.asyncio
+    async def test_welcome(self, manager):
+        """Test that the CONNECTED message resolves the welcome"""
+        manager.ws.receive({"type": "CONNECTED", "session_id": "s", "extension_connected": True})
+
+        welcome = await manager.wait_for_welcome(timeout=1)
+
+        assert welcome["session_id"] == "s"
+
+    @pytest.mark.asyncio
+    async def test_command_result(self, manager):
+        """Test that a response resolves the command with its id"""
+        task = asyncio.create_task(manager.send_command("GET_TAB_INFO", {"tabId": 1}, timeout=1))
+        request = await next_request(manager)
+        assert request == {"id": request["id"], "type": "GET_TAB_INFO", "tabId": 1}
+
+        manager.ws.receive({"id": request["id"], "type": "RESPONSE", "success": True, "result": {"url": "u"}})
+
+        assert await task == {"url": "u"}
+        assert not manager.pending_responses
+
+    @pytest.mark.asyncio
+    async def test_command_error(self, manager):
+        """Test that an unsuccessful response raises"""
+        task = asyncio.create_task(manager.send_tab_command("CLOSE_TAB", 1, timeout=1))
+        request = await next_request(manager)
+        assert request == {"id": request["id"], "type": "CLOSE_TAB", "tabId": 1}
+
+        manager.ws.receive({"id": request["id"], "type": "RESPONSE", "success": False, "error": "boom"})
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await task
+
+    @pytest.mark.asyncio
+    async def test_timeout_then_late_response(self, manager):
+        """Test that a timed-out command is forgotten and its late reply ignored"""
+        with pytest.raises(TimeoutError):
+            await manager.send_command("SLOW", {}, timeout=0.05)
+        request = await next_request(manager)
+        assert not manager.pending_responses
+
+        manager.ws.receive({"id": request["id"], "type": "RESPONSE", "success": True, "result": 1})
+        task = asyncio.create_task(manager.send_command("NEXT", {}, timeout=1))
+        next_one = await next_request(manager)
+        manager.ws.receive({"id": next_one["id"], "type": "RESPONSE", "success": True, "result": 2})
+
+        assert await task == 2
+
+    @pytest.mark.asyncio
+    async def test_response_for_cancelled_caller(self, manager):
+        """Test that a reply for a caller cancelled from outside doesn't break the receiver"""
+        task = asyncio.create_task(manager.send_command("X", {}, timeout=1))
+        request = await next_request(manager)
+        task.cancel()
+        await asyncio.sleep(0)
+
+        manager.ws.receive({"id": request["id"], "type": "RESPONSE", "success": True, "result": 1})
+        follow_up = asyncio.create_task(manager.send_command("Y", {}, timeout=1))
+        second = await next_request(manager)
+        manager.ws.receive({"id": second["id"], "type": "RESPONSE", "success": True, "result": 2})
+
+        assert await follow_up == 2
+
+
+class TestLifecycle:
+    """Test closing the manager and losing the connection"""
+
+    @pytest.mark.asyncio
+    async def test_close_fails_pending_commands(self):
+        """Test that close() fails waiting commands instead of leaving them to time out"""
+        async with WebSocketManager(MockWebSocket(), MagicMock()) as manager:
+            task = asyncio.create_task(manager.send_command("X", {}, timeout=10))
+            await next_request(manager)
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(task, timeout=1)
+        assert not manager.pending_responses
+        assert manager._receiver_task.done()
+
+    @pytest.mark.asyncio
+    async def test_disconnect_fails_pending_commands(self, manager):
+        """Test that the connection ending fails waiting commands"""
+        task = asyncio.create_task(manager.send_command("X", {}, timeout=10))
+        await next_request(manager)
+
+        manager.ws.disconnect()
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(task, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_event_handler_errors_are_rate_limited(self, manager):
+        """Test that a failing handler logs once, then a summary on close"""
+        def failing_handler(params):
+            raise ValueError("bad handler")
+
+        manager.register_event_handler("Page.loadEventFired", failing_handler)
+        for _ in range(50):
+            manager.ws.receive({"type": "CDP_EVENT", "method": "Page.loadEventFired", "params": {}})
+        await asyncio.sleep(0.05)
+        await manager.close()
+
+        messages = [call.args[0] for call in manager.logger.error.call_args_list]
+        assert messages == [
+            "Error in event handler: bad handler",
+            "49 more error(s) suppressed after the last one",
+        ]